@@ -0,0 +1,173 @@
+import asyncio
+import functools
+import logging
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import AsyncIterator, Callable, Iterable, Optional, Union
+
+from constants import BATCH_MAX_CONCURRENCY
+from exceptions import HackyAssemblyTimeoutError
+from hacky import HackyAssembler
+from preprocessor import Preprocessor
+
+# shared by all jobs of a worker, so included libraries are parsed once
+_PREPROCESSOR = Preprocessor()
+
+
+@dataclass(frozen=True)
+class AssemblySource:
+    """In-memory assembly source, `name` is only used to identify the result.
+
+    `#include` paths are resolved against `base_dir`, the working directory
+    of the process if it is not set.
+    """
+    name: str
+    content: str
+    base_dir: Optional[Path] = None
+
+
+Source = Union[str, Path, AssemblySource]
+
+
+@dataclass(frozen=True)
+class AssemblyResult:
+    source: Source
+    output: Optional[str] = None
+    error: Optional[Exception] = None
+
+    @property
+    def succeeded(self) -> bool:
+        return self.error is None
+
+
+def _assemble(source: Source, log_level: int) -> str:
+    # module level function, so it can be pickled for process executors
+    hacky = HackyAssembler(log_level=log_level, preprocessor=_PREPROCESSOR)
+    if isinstance(source, AssemblySource):
+        return hacky.assemble_source(source.content, source.base_dir)
+    return hacky.assemble(str(source))
+
+
+def _assemble_job(started: Optional[Callable[[], None]], source: Source, log_level: int) -> str:
+    if started is not None:
+        started()
+    return _assemble(source, log_level)
+
+
+def _source_name(source: Source) -> str:
+    if isinstance(source, AssemblySource):
+        return source.name
+    return str(source)
+
+
+def _set_started(started: asyncio.Future) -> None:
+    if not started.done():
+        started.set_result(None)
+
+
+def _consume_result(job: asyncio.Future) -> None:
+    # abandoned jobs are never awaited, retrieve their exception to keep asyncio quiet
+    if not job.cancelled():
+        job.exception()
+
+
+def _submit_job(
+        executor: Optional[Executor],
+        source: Source,
+        log_level: int
+) -> tuple[asyncio.Future, asyncio.Future]:
+    loop = asyncio.get_running_loop()
+    started = loop.create_future()
+    if isinstance(executor, ProcessPoolExecutor):
+        # a worker process can not reach the loop, the deadline starts on submission
+        _set_started(started)
+        notify = None
+    else:
+        notify = functools.partial(loop.call_soon_threadsafe, _set_started, started)
+    job = loop.run_in_executor(executor, _assemble_job, notify, source, log_level)
+    job.add_done_callback(_consume_result)
+    return job, started
+
+
+async def _run_job(
+        job: asyncio.Future,
+        started: asyncio.Future,
+        source: Source,
+        timeout: Optional[float]
+) -> AssemblyResult:
+    try:
+        if timeout is None:
+            output = await asyncio.shield(job)
+        else:
+            # the deadline starts when a worker picks the job up, not when it is queued
+            await asyncio.wait({started, job}, return_when=asyncio.FIRST_COMPLETED)
+            output = await asyncio.wait_for(asyncio.shield(job), timeout)
+    except asyncio.TimeoutError:
+        error = HackyAssemblyTimeoutError(
+            f"Assembling '{_source_name(source)}' took longer than {timeout} seconds"
+        )
+        return AssemblyResult(source=source, error=error)
+    except Exception as exc:  # pylint: disable=broad-except
+        # any failure belongs to this source only, e.g. a file that is not valid utf-8
+        return AssemblyResult(source=source, error=exc)
+    return AssemblyResult(source=source, output=output)
+
+
+async def assemble_many(
+        sources: Iterable[Source],
+        *,
+        executor: Optional[Executor] = None,
+        max_concurrency: int = BATCH_MAX_CONCURRENCY,
+        timeout: Optional[float] = None,
+        log_level: int = logging.INFO
+) -> AsyncIterator[AssemblyResult]:
+    """Assemble sources in `executor` and yield results in completion order.
+
+    At most `max_concurrency` jobs occupy the executor, new sources are pulled
+    from `sources` only when the consumer takes a result. Any error of a job,
+    including a timeout, is reported in its result instead of stopping the batch.
+
+    The timeout of a job starts when a worker picks it up. Running jobs can not
+    be interrupted, neither in threads nor in worker processes: a timed out job
+    is reported right away but keeps its slot until it really finishes, so it
+    never takes capacity away from jobs it does not know about. Worker
+    processes can not report when they pick a job up, so with a
+    `ProcessPoolExecutor` the timeout starts on submission and
+    `max_concurrency` should not exceed its number of workers.
+    """
+    if max_concurrency < 1:
+        raise ValueError(f'max_concurrency must be positive, got: {max_concurrency}')
+
+    jobs = iter(sources)
+    # executor jobs, including timed out ones that are still running
+    busy: set[asyncio.Future] = set()
+    pending: set[asyncio.Task] = set()
+    exhausted = False
+    try:
+        while True:
+            busy = {job for job in busy if not job.done()}
+            if not exhausted and len(busy) < max_concurrency:
+                for source in jobs:
+                    job, started = _submit_job(executor, source, log_level)
+                    busy.add(job)
+                    pending.add(asyncio.create_task(_run_job(job, started, source, timeout)))
+                    if len(busy) >= max_concurrency:
+                        break
+                else:
+                    exhausted = True
+
+            if not pending and (exhausted or not busy):
+                return
+
+            done, _ = await asyncio.wait(pending | busy, return_when=asyncio.FIRST_COMPLETED)
+            for task in pending & done:
+                pending.discard(task)
+                yield task.result()
+    finally:
+        # consumer stopped early or was cancelled, do not leave jobs behind,
+        # queued jobs are dropped and running ones are left to finish
+        for future in pending | busy:
+            future.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
@@ -14,3 +14,17 @@ OUTPUT_FILE_EXTENSION = '.hack'
 
 ALLOWED_SYMBOL_CHARS = set(string.ascii_letters + string.digits + '_.$:')
 A_CONSTANT_RANGE = (0, 32767)
+
+BATCH_MAX_CONCURRENCY = 4
+
+DIRECTIVE_MARK = '#'
+INCLUDE_DIRECTIVE = 'include'
+MACRO_DIRECTIVE = 'macro'
+ENDMACRO_DIRECTIVE = 'endmacro'
+MACRO_PARAM_MARK = '%'
+MACRO_LOCAL_LABEL_MARK = '%%'
+PREPROCESSOR_CACHE_SIZE = 128
+
+TRACE_FORMAT_JSONL = 'jsonl'
+TRACE_FORMAT_BINARY = 'binary'
+TRACE_QUEUE_SIZE = 65536
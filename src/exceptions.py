@@ -16,3 +16,11 @@ class HackyFailedToWriteFile(HackyBaseException):
 
 class HackyInternalError(HackySyntaxError):
     ...
+
+
+class HackyAssemblyTimeoutError(HackyBaseException):
+    ...
+
+
+class HackyPreprocessorError(HackySyntaxError):
+    ...
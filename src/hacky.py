@@ -1,7 +1,8 @@
 #!/usr/bin/python3
 
 import logging
-from typing import List
+from pathlib import Path
+from typing import List, Optional
 
 from constants import VAR_INST_START_ADDR
 from custom_types import SymbolTable
@@ -9,20 +10,35 @@ from exceptions import HackySyntaxError, HackyBaseException
 from helper import HackyAssemblerHelper
 from logger import logger
 from models import CInstructionModel, AInstructionModel
+from preprocessor import Preprocessor
+from tracer import TraceWriter
 from utils import is_absolute_address
 
 
 class HackyAssembler(HackyAssemblerHelper):
     def __init__(
             self,
-            log_level=logging.INFO
+            log_level=logging.INFO,
+            preprocessor: Optional[Preprocessor] = None,
+            tracer: Optional[TraceWriter] = None
     ) -> None:
         self.debug = log_level
         self.logger = logger
         self.logger.setLevel(log_level)
+        self.preprocessor = preprocessor or Preprocessor()
+        self.tracer = tracer
 
     def assemble(self, file_path: str) -> str:
         content = self._preprocess_file(file_path)
+        content = self.preprocessor.expand(content, Path(file_path).parent)
+        return self._assemble_content(content)
+
+    def assemble_source(self, source: str, base_dir: Optional[Path] = None) -> str:
+        content = self._preprocess_lines(source.splitlines())
+        content = self.preprocessor.expand(content, base_dir)
+        return self._assemble_content(content)
+
+    def _assemble_content(self, content: List[str]) -> str:
         symbol_table = self._build_symbol_table(content)
         assembled = self._resolve_labels(symbol_table, content)
         return assembled
@@ -34,7 +50,6 @@ class HackyAssembler(HackyAssemblerHelper):
 
     def assemble_c_instruction(self, inst: str) -> str:
         try:
-            self.logger.debug('Assembling C instruction: %s', inst)
             opcode = CInstructionModel.parse_instruction(inst).opcode()
         except HackyBaseException as exc:
             raise HackySyntaxError(f"Unable to assemble instruction '{inst}'. Reason: {str(exc)}") from exc
@@ -43,7 +58,6 @@ class HackyAssembler(HackyAssemblerHelper):
 
     def assemble_a_instruction(self, inst: str, symbol_table: SymbolTable) -> str:
         try:
-            self.logger.debug('Assembling A instruction: %s', inst)
             opcode = AInstructionModel(inst=inst).opcode(symbol_table)
         except HackyBaseException as exc:
             raise HackySyntaxError(f"Unable to assemble instruction '{inst}'. Reason: {str(exc)}") from exc
@@ -51,8 +65,10 @@ class HackyAssembler(HackyAssemblerHelper):
         return opcode
 
     def _resolve_labels(self, symbol_table: SymbolTable, content: List[str]) -> str:
-        opcodes = []
+        opcodes: List[str] = []
         curr_var_addr = VAR_INST_START_ADDR
+        # bound once, so the loop pays a single None check when tracing is off
+        trace = self.tracer.record if self.tracer is not None else None
         for line in content:
             if self._is_label(line):
                 continue
@@ -67,10 +83,21 @@ class HackyAssembler(HackyAssemblerHelper):
             else:
                 assembled_inst = self.assemble_c_instruction(line)
 
+            if trace is not None:
+                symbol, value = self._resolve_trace_symbol(line, symbol_table)
+                trace((line, len(opcodes), symbol, value, assembled_inst))
             opcodes.append(assembled_inst)
 
         return '\n'.join(opcodes)
 
+    def _resolve_trace_symbol(self, line: str, symbol_table: SymbolTable) -> tuple[Optional[str], Optional[int]]:
+        if not self._is_a_instruction(line):
+            return None, None
+        a_const = self._get_a_const_value(line)
+        if is_absolute_address(a_const):
+            return None, None
+        return a_const, symbol_table[a_const]
+
 
 if __name__ == '__main__':
     import sys
@@ -64,9 +64,12 @@ class HackyAssemblerHelper:
 
     def _preprocess_file(self, file_path: str) -> list[str]:
         self._validate_file_extension(file_path)
+        content = self._read_file(file_path)
+        return self._preprocess_lines(content)
 
+    @staticmethod
+    def _preprocess_lines(content: list[str]) -> list[str]:
         instructions: list[str] = []
-        content = self._read_file(file_path)
         for line in content:
             if line.startswith(COMMENT_MARK) or not line:
                 continue
@@ -74,6 +77,9 @@ class HackyAssemblerHelper:
                 # in-line comment, remove
                 line, _, _ = line.partition(COMMENT_MARK)
             line = line.strip()
+            if not line:
+                # indented comment or whitespace only line
+                continue
             instructions.append(line)
         return instructions
 
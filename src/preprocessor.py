@@ -0,0 +1,241 @@
+import hashlib
+import re
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterator, Optional, Union
+
+from constants import (
+    ALLOWED_SYMBOL_CHARS,
+    DIRECTIVE_MARK,
+    ENDMACRO_DIRECTIVE,
+    INCLUDE_DIRECTIVE,
+    MACRO_DIRECTIVE,
+    MACRO_LOCAL_LABEL_MARK,
+    MACRO_PARAM_MARK,
+    PREPROCESSOR_CACHE_SIZE
+)
+from exceptions import HackyPreprocessorError
+from helper import HackyAssemblerHelper
+
+RESERVED_DIRECTIVES = {INCLUDE_DIRECTIVE, MACRO_DIRECTIVE, ENDMACRO_DIRECTIVE}
+
+_SYMBOL_PATTERN = '[' + re.escape(''.join(sorted(ALLOWED_SYMBOL_CHARS))) + ']+'
+_PARAM_PATTERN = '[A-Za-z_][A-Za-z0-9_]*'
+# local labels are matched first, so '%%LOOP' is not taken for a parameter reference
+_SUBSTITUTION_RE = re.compile(
+    f'{re.escape(MACRO_LOCAL_LABEL_MARK)}({_SYMBOL_PATTERN})|{re.escape(MACRO_PARAM_MARK)}({_PARAM_PATTERN})'
+)
+
+
+@dataclass(frozen=True)
+class Include:
+    path: str
+
+
+@dataclass(frozen=True)
+class MacroCall:
+    name: str
+    args: tuple[str, ...]
+
+
+@dataclass(frozen=True)
+class Macro:
+    name: str
+    params: tuple[str, ...]
+    body: tuple[str, ...]
+
+
+Statement = Union[str, Include, MacroCall, Macro]
+
+
+@dataclass
+class _Expansion:
+    """State of a single translation unit, never shared between units"""
+    macros: dict[str, Macro] = field(default_factory=dict)
+    include_stack: list[Path] = field(default_factory=list)
+    included: set[Path] = field(default_factory=set)
+    macro_stack: list[str] = field(default_factory=list)
+    label_counter: int = 0
+    labels: set[str] = field(default_factory=set)
+    generated_labels: set[str] = field(default_factory=set)
+    output: list[str] = field(default_factory=list)
+
+
+class Preprocessor(HackyAssemblerHelper):
+    """Expands `#include "file"` and `#NAME args` macro calls into plain instructions.
+
+    Macros are defined with `#macro NAME param1, param2` ... `#endmacro`,
+    parameters are referenced as `%param` and labels written as `%%LABEL`
+    get a unique name for every expansion. A file included more than once in
+    a translation unit is only expanded the first time. Parsed included files
+    are cached by content hash, so one instance can be shared by a whole build.
+    """
+
+    def __init__(self, cache_size: int = PREPROCESSOR_CACHE_SIZE) -> None:
+        self.cache_size = cache_size
+        self._cache: dict[str, tuple[Statement, ...]] = {}
+        self._lock = threading.Lock()
+
+    def expand(self, content: list[str], base_dir: Optional[Path] = None) -> list[str]:
+        expansion = _Expansion()
+        self._expand_statements(self._parse(content), base_dir or Path(), expansion)
+        return expansion.output
+
+    def _expand_statements(self, statements: tuple[Statement, ...], base_dir: Path, expansion: _Expansion) -> None:
+        for statement in statements:
+            if isinstance(statement, str):
+                self._emit(statement, expansion)
+            elif isinstance(statement, Include):
+                self._expand_include(base_dir / statement.path, expansion)
+            elif isinstance(statement, Macro):
+                self._define_macro(statement, expansion)
+            else:
+                self._expand_macro_call(statement, base_dir, expansion)
+
+    def _emit(self, line: str, expansion: _Expansion) -> None:
+        self._validate_no_macro_references(line)
+        if self._is_label(line):
+            label = self._get_label_name(line)
+            if label in expansion.generated_labels and label in expansion.labels:
+                raise HackyPreprocessorError(f"Label '{label}' collides with a label generated for a macro")
+            expansion.labels.add(label)
+        expansion.output.append(line)
+
+    @staticmethod
+    def _validate_no_macro_references(line: str) -> None:
+        # references left after substitution were written outside of any macro body
+        match = _SUBSTITUTION_RE.search(line)
+        if match is not None:
+            raise HackyPreprocessorError(f"Reference '{match.group()}' is only allowed inside a macro body")
+
+    def _expand_include(self, file_path: Path, expansion: _Expansion) -> None:
+        resolved = file_path.resolve()
+        if resolved in expansion.include_stack:
+            raise HackyPreprocessorError(f"Recursive include of '{file_path}'")
+        if resolved in expansion.included:
+            # every file is included once per translation unit, e.g. a library shared by two includes
+            return
+
+        expansion.included.add(resolved)
+        expansion.include_stack.append(resolved)
+        self._expand_statements(self._load(file_path), file_path.parent, expansion)
+        expansion.include_stack.pop()
+
+    @staticmethod
+    def _define_macro(macro: Macro, expansion: _Expansion) -> None:
+        defined = expansion.macros.get(macro.name)
+        if defined is not None and defined != macro:
+            raise HackyPreprocessorError(f"Macro '{macro.name}' is already defined")
+        expansion.macros[macro.name] = macro
+
+    def _expand_macro_call(self, call: MacroCall, base_dir: Path, expansion: _Expansion) -> None:
+        macro = expansion.macros.get(call.name)
+        if macro is None:
+            raise HackyPreprocessorError(f"Macro '{call.name}' is not defined")
+        if len(call.args) != len(macro.params):
+            raise HackyPreprocessorError(
+                f"Macro '{call.name}' expects {len(macro.params)} argument(s), got: {len(call.args)}"
+            )
+        if call.name in expansion.macro_stack:
+            raise HackyPreprocessorError(f"Recursive expansion of macro '{call.name}'")
+        for arg in call.args:
+            self._validate_no_macro_references(arg)
+
+        name = macro.name
+        args = dict(zip(macro.params, call.args))
+        suffix = expansion.label_counter
+        expansion.label_counter += 1
+
+        def substitute(match: re.Match) -> str:
+            label, param = match.groups()
+            if label is not None:
+                generated = f'{name}${label}.{suffix}'
+                if generated in expansion.labels:
+                    raise HackyPreprocessorError(f"Label '{generated}' generated for macro '{name}' already exists")
+                expansion.generated_labels.add(generated)
+                return generated
+            if param not in args:
+                raise HackyPreprocessorError(f"Macro '{name}' has no parameter '{param}'")
+            return args[param]
+
+        body = [_SUBSTITUTION_RE.sub(substitute, line) for line in macro.body]
+        expansion.macro_stack.append(call.name)
+        self._expand_statements(self._parse(body), base_dir, expansion)
+        expansion.macro_stack.pop()
+
+    def _load(self, file_path: Path) -> tuple[Statement, ...]:
+        content = self._read_file(str(file_path))
+        key = hashlib.sha256('\n'.join(content).encode('utf-8')).hexdigest()
+        with self._lock:
+            statements = self._cache.get(key)
+        if statements is not None:
+            return statements
+
+        statements = self._parse(self._preprocess_lines(content))
+        with self._lock:
+            if len(self._cache) >= self.cache_size:
+                # evict the oldest entry, dicts keep insertion order
+                self._cache.pop(next(iter(self._cache)))
+            self._cache[key] = statements
+        return statements
+
+    def _parse(self, content: list[str]) -> tuple[Statement, ...]:
+        statements: list[Statement] = []
+        lines = iter(content)
+        for line in lines:
+            if not line.startswith(DIRECTIVE_MARK):
+                statements.append(line)
+                continue
+
+            directive, _, rest = line.removeprefix(DIRECTIVE_MARK).partition(' ')
+            rest = rest.strip()
+            if directive == INCLUDE_DIRECTIVE:
+                statements.append(Include(path=self._parse_include_path(rest)))
+            elif directive == MACRO_DIRECTIVE:
+                statements.append(self._parse_macro(rest, lines))
+            elif directive == ENDMACRO_DIRECTIVE:
+                raise HackyPreprocessorError(f"Unexpected '{line}' without macro definition")
+            else:
+                self._validate_macro_name(directive)
+                statements.append(MacroCall(name=directive, args=self._split_args(rest)))
+        return tuple(statements)
+
+    @staticmethod
+    def _parse_include_path(rest: str) -> str:
+        if len(rest) < 2 or rest[0] != '"' or rest[-1] != '"':
+            raise HackyPreprocessorError(f'Include path must be quoted, got: {rest}')
+        return rest[1:-1]
+
+    def _parse_macro(self, header: str, lines: Iterator[str]) -> Macro:
+        name, _, params = header.partition(' ')
+        self._validate_macro_name(name)
+        param_names = self._split_args(params)
+        for param in param_names:
+            if not re.fullmatch(_PARAM_PATTERN, param):
+                raise HackyPreprocessorError(f"Invalid parameter name '{param}' of macro '{name}'")
+        if len(set(param_names)) != len(param_names):
+            raise HackyPreprocessorError(f"Duplicate parameter names of macro '{name}'")
+
+        body: list[str] = []
+        for line in lines:
+            if line == DIRECTIVE_MARK + ENDMACRO_DIRECTIVE:
+                return Macro(name=name, params=param_names, body=tuple(body))
+            if line.startswith(DIRECTIVE_MARK + MACRO_DIRECTIVE + ' ') or \
+                    line.startswith(DIRECTIVE_MARK + INCLUDE_DIRECTIVE + ' '):
+                raise HackyPreprocessorError(f"Directive '{line}' is not allowed inside macro '{name}'")
+            body.append(line)
+        raise HackyPreprocessorError(f"Macro '{name}' is not terminated with '{DIRECTIVE_MARK}{ENDMACRO_DIRECTIVE}'")
+
+    @staticmethod
+    def _split_args(rest: str) -> tuple[str, ...]:
+        if not rest:
+            return ()
+        return tuple(arg.strip() for arg in rest.split(','))
+
+    @staticmethod
+    def _validate_macro_name(name: str) -> None:
+        if not name or name in RESERVED_DIRECTIVES:
+            raise HackyPreprocessorError(f"Invalid macro name '{name}'")
+        if name[0].isdigit() or any(ch not in ALLOWED_SYMBOL_CHARS for ch in name):
+            raise HackyPreprocessorError(f"Macro name '{name}' can contain only allowed characters")
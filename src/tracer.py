@@ -0,0 +1,96 @@
+import json
+import queue
+import struct
+import threading
+from typing import BinaryIO, Optional
+
+from constants import TRACE_FORMAT_BINARY, TRACE_FORMAT_JSONL, TRACE_QUEUE_SIZE
+from exceptions import HackyFailedToWriteFile
+
+# address, word, resolved symbol value (-1 if none), source length, symbol length
+BINARY_RECORD_HEADER = struct.Struct('<IHiHH')
+
+# source, address, symbol, resolved symbol value, emitted word
+TraceRecord = tuple[str, int, Optional[str], Optional[int], str]
+
+_STOP = None
+
+
+class TraceWriter:
+    """Writes one record per assembled instruction from a background thread.
+
+    `record` only puts a tuple on a queue, serialization and file I/O happen
+    in the writer thread. The queue holds at most `queue_size` records, when
+    the writer falls behind `record` blocks instead of buffering the whole
+    program. Records are JSON lines or, for `binary` format,
+    `BINARY_RECORD_HEADER` followed by utf-8 source and symbol.
+    """
+
+    def __init__(
+            self,
+            file_path: str,
+            trace_format: str = TRACE_FORMAT_JSONL,
+            queue_size: int = TRACE_QUEUE_SIZE
+    ) -> None:
+        if trace_format not in (TRACE_FORMAT_JSONL, TRACE_FORMAT_BINARY):
+            raise ValueError(f"Invalid trace format, expected: '{TRACE_FORMAT_JSONL}' or "
+                             f"'{TRACE_FORMAT_BINARY}', got: '{trace_format}'")
+        try:
+            self._file: BinaryIO = open(file_path, 'wb')  # pylint: disable=consider-using-with
+        except OSError as exc:
+            raise HackyFailedToWriteFile(f'Unable to open trace file. Reason: {exc}') from exc
+
+        self._encode = self._encode_jsonl if trace_format == TRACE_FORMAT_JSONL else self._encode_binary
+        self._queue: queue.Queue[Optional[TraceRecord]] = queue.Queue(maxsize=queue_size)
+        self._error: Optional[Exception] = None
+        self._thread = threading.Thread(target=self._run, name='hacky-trace-writer', daemon=True)
+        self._thread.start()
+
+    def record(self, trace_record: TraceRecord) -> None:
+        self._queue.put(trace_record)
+
+    def close(self) -> None:
+        try:
+            if self._thread.is_alive():
+                self._queue.put(_STOP)
+                self._thread.join()
+        finally:
+            self._file.close()
+        if self._error is not None:
+            raise HackyFailedToWriteFile(f'Unable to write trace file. Reason: {self._error}') from self._error
+
+    def __enter__(self) -> 'TraceWriter':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _run(self) -> None:
+        while (trace_record := self._queue.get()) is not _STOP:
+            if self._error is not None:
+                # keep draining, so producers never block on a broken file
+                continue
+            try:
+                self._file.write(self._encode(trace_record))
+            except Exception as exc:  # pylint: disable=broad-except
+                # the thread must survive any failure, close() reports it to the caller
+                self._error = exc
+
+    @staticmethod
+    def _encode_jsonl(trace_record: TraceRecord) -> bytes:
+        source, address, symbol, value, word = trace_record
+        line = json.dumps(
+            {'source': source, 'address': address, 'symbol': symbol, 'value': value, 'word': word},
+            separators=(',', ':')
+        )
+        return (line + '\n').encode('utf-8')
+
+    @staticmethod
+    def _encode_binary(trace_record: TraceRecord) -> bytes:
+        source, address, symbol, value, word = trace_record
+        source_bytes = source.encode('utf-8')
+        symbol_bytes = (symbol or '').encode('utf-8')
+        header = BINARY_RECORD_HEADER.pack(
+            address, int(word, 2), -1 if value is None else value, len(source_bytes), len(symbol_bytes)
+        )
+        return header + source_bytes + symbol_bytes
@@ -0,0 +1,16 @@
+// Stack helpers, SP points to the next free slot
+#macro PUSH_CONST value
+    @%value
+    D=A
+    @SP
+    A=M
+    M=D
+    @SP
+    M=M+1
+#endmacro
+
+#macro HALT
+(%%END)
+    @%%END
+    0;JMP
+#endmacro
@@ -0,0 +1,9 @@
+// Pushes 7 and 8 onto the stack
+#include "lib/stack.asm"
+    @256
+    D=A
+    @SP
+    M=D
+#PUSH_CONST 7
+#PUSH_CONST 8
+#HALT
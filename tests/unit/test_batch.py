@@ -0,0 +1,157 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from batch import AssemblySource, assemble_many
+from exceptions import HackyAssemblyTimeoutError, HackyFailedToProcessFileError, HackySyntaxError
+from helper import PROJECT_BASE_PATH
+
+
+class TestAssembleMany:
+    TEST_FIXTURES_PATH = PROJECT_BASE_PATH / 'tests/fixtures/'
+
+    def get_fixture_file(self, file_name):
+        return Path(self.TEST_FIXTURES_PATH) / file_name
+
+    @staticmethod
+    def collect(sources, **kwargs):
+        async def run():
+            return [result async for result in assemble_many(sources, **kwargs)]
+
+        return asyncio.run(run())
+
+    def test_assemble_many(self):
+        sources = [
+            self.get_fixture_file('with_labels.asm'),
+            AssemblySource(name='inline', content='@R0\nD=M // comment\n'),
+        ]
+        results = {result.source: result for result in self.collect(sources)}
+
+        assert results[sources[0]].succeeded
+        assert results[sources[0]].output == "\n".join(["0000000000000000", "1110101010000111"])
+        assert results[sources[1]].output == "\n".join(["0000000000000000", "1111110000010000"])
+
+    def test_assemble_many_include_base_dir(self):
+        sources = [AssemblySource(name='inline', content='#include "lib/stack.asm"\n#HALT',
+                                  base_dir=self.TEST_FIXTURES_PATH)]
+        results = self.collect(sources)
+
+        assert results[0].output == "\n".join(["0000000000000000", "1110101010000111"])
+
+    def test_assemble_many_reports_errors(self):
+        sources = [
+            '/path/to/file.asm',
+            AssemblySource(name='invalid', content='B=M+1'),
+            AssemblySource(name='valid', content='0;JMP'),
+        ]
+        results = {result.source: result for result in self.collect(sources)}
+
+        assert isinstance(results[sources[0]].error, HackyFailedToProcessFileError)
+        assert isinstance(results[sources[1]].error, HackySyntaxError)
+        assert results[sources[2]].output == "1110101010000111"
+
+    @pytest.mark.parametrize('timeout', (None, 10))
+    def test_assemble_many_reports_undecodable_file(self, tmp_path, timeout):
+        undecodable = tmp_path / 'latin1.asm'
+        undecodable.write_bytes('// caf\xe9\n@0'.encode('latin-1'))
+        sources = [undecodable, AssemblySource(name='valid', content='0;JMP')]
+        results = {result.source: result for result in self.collect(sources, timeout=timeout)}
+
+        assert isinstance(results[undecodable].error, UnicodeDecodeError)
+        assert results[sources[1]].output == "1110101010000111"
+
+    def test_assemble_many_bounded_concurrency(self):
+        lock = threading.Lock()
+        running, peak = 0, 0
+
+        def slow_assemble(source, _):
+            nonlocal running, peak
+            with lock:
+                running += 1
+                peak = max(peak, running)
+            time.sleep(0.01)
+            with lock:
+                running -= 1
+            return source.content
+
+        sources = [AssemblySource(name=str(i), content=str(i)) for i in range(10)]
+        with ThreadPoolExecutor(max_workers=8) as executor, patch('batch._assemble', slow_assemble):
+            results = self.collect(sources, executor=executor, max_concurrency=2)
+
+        assert sorted(result.output for result in results) == sorted(str(i) for i in range(10))
+        assert peak <= 2
+
+    def test_assemble_many_timeout(self):
+        release = threading.Event()
+
+        def fake_assemble(source, _):
+            if source.name == 'slow':
+                release.wait(1)
+            return source.content
+
+        sources = [AssemblySource(name='slow', content='slow'), AssemblySource(name='fast', content='fast')]
+        with ThreadPoolExecutor(max_workers=2) as executor, patch('batch._assemble', fake_assemble):
+            results = self.collect(sources, executor=executor, timeout=0.05)
+            release.set()
+
+        assert results[0].output == 'fast'
+        assert isinstance(results[1].error, HackyAssemblyTimeoutError)
+        assert str(results[1].error) == "Assembling 'slow' took longer than 0.05 seconds"
+
+    def test_assemble_many_slow_sources_do_not_starve_the_rest(self):
+        lock = threading.Lock()
+        running, peak = 0, 0
+
+        def fake_assemble(source, _):
+            nonlocal running, peak
+            with lock:
+                running += 1
+                peak = max(peak, running)
+            time.sleep(0.3 if source.name.startswith('slow') else 0.01)
+            with lock:
+                running -= 1
+            return source.content
+
+        # more pathological sources than workers, fast ones are queued behind them
+        sources = [AssemblySource(name=f'slow{i}', content='slow') for i in range(3)]
+        sources += [AssemblySource(name=f'fast{i}', content='fast') for i in range(4)]
+        with ThreadPoolExecutor(max_workers=2) as executor, patch('batch._assemble', fake_assemble):
+            results = self.collect(sources, executor=executor, max_concurrency=2, timeout=0.1)
+
+        results = {result.source.name: result for result in results}
+        assert all(results[f'fast{i}'].output == 'fast' for i in range(4))
+        assert all(isinstance(results[f'slow{i}'].error, HackyAssemblyTimeoutError) for i in range(3))
+        assert peak <= 2
+
+    def test_assemble_many_process_executor(self):
+        sources = [AssemblySource(name=str(i), content=f'@{i}') for i in range(3)]
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            results = self.collect(sources, executor=executor, max_concurrency=2, timeout=10)
+
+        assert sorted(result.output for result in results) == [f'{i:016b}' for i in range(3)]
+
+    def test_assemble_many_stops_pulling_sources_when_closed(self):
+        pulled = []
+
+        def sources():
+            for i in range(10):
+                pulled.append(i)
+                yield AssemblySource(name=str(i), content='0;JMP')
+
+        async def run():
+            results = assemble_many(sources(), max_concurrency=2)
+            result = await anext(results)
+            await results.aclose()
+            return result
+
+        assert asyncio.run(run()).succeeded
+        assert len(pulled) <= 3
+
+    def test_assemble_many_invalid_concurrency(self):
+        with pytest.raises(ValueError, match='max_concurrency must be positive, got: 0'):
+            self.collect([], max_concurrency=0)
@@ -68,6 +68,16 @@ class TestHackyAssembler:
                         "1110101010000111"
                     ])
             ),
+            (
+                    "with_macros.asm",
+                    "\n".join([
+                        "0000000100000000", "1110110000010000", "0000000000000000", "1110001100001000",
+                        "0000000000000111", "1110110000010000", "0000000000000000", "1111110000100000",
+                        "1110001100001000", "0000000000000000", "1111110111001000", "0000000000001000",
+                        "1110110000010000", "0000000000000000", "1111110000100000", "1110001100001000",
+                        "0000000000000000", "1111110111001000", "0000000000010010", "1110101010000111"
+                    ])
+            ),
     ))
     def test_assemble(self, hacky, test_file, result):
         test_file = self.get_fixture_file(test_file)
@@ -270,3 +280,12 @@ class TestHackyAssembler:
                 match=re.escape(f'Can not resolve "{inst}" instruction')
         ):
             assert hacky.assemble_a_instruction(inst, symbol_table)
+
+    def test_assemble_source(self, hacky):
+        source = self.get_fixture_file('with_labels.asm').read_text(encoding='utf-8')
+        assert hacky.assemble_source(source) == "\n".join(["0000000000000000", "1110101010000111"])
+
+    def test_assemble_source_with_include(self, hacky):
+        source = '#include "lib/stack.asm"\n#HALT'
+        result = "\n".join(["0000000000000000", "1110101010000111"])
+        assert hacky.assemble_source(source, self.TEST_FIXTURES_PATH) == result
@@ -0,0 +1,126 @@
+import re
+from unittest.mock import patch
+
+import pytest
+
+from exceptions import HackyPreprocessorError, HackyFailedToProcessFileError
+from helper import PROJECT_BASE_PATH
+from preprocessor import Preprocessor
+
+
+class TestPreprocessor:
+    TEST_FIXTURES_PATH = PROJECT_BASE_PATH / 'tests/fixtures/'
+
+    @pytest.fixture
+    def preprocessor(self):
+        yield Preprocessor()
+
+    def test_expand_without_directives(self, preprocessor):
+        assert preprocessor.expand(['@R0', 'D=M']) == ['@R0', 'D=M']
+
+    def test_expand_include(self, preprocessor):
+        content = preprocessor.expand(['#include "with_macros.asm"'], self.TEST_FIXTURES_PATH)
+        assert content == [
+            '@256', 'D=A', '@SP', 'M=D',
+            '@7', 'D=A', '@SP', 'A=M', 'M=D', '@SP', 'M=M+1',
+            '@8', 'D=A', '@SP', 'A=M', 'M=D', '@SP', 'M=M+1',
+            '(HALT$END.2)', '@HALT$END.2', '0;JMP',
+        ]
+
+    def test_expand_hygienic_labels(self, preprocessor):
+        content = preprocessor.expand([
+            '#macro WAIT',
+            '(%%LOOP)',
+            '@%%LOOP',
+            '0;JMP',
+            '#endmacro',
+            '#WAIT',
+            '#WAIT',
+        ])
+        assert content == ['(WAIT$LOOP.0)', '@WAIT$LOOP.0', '0;JMP', '(WAIT$LOOP.1)', '@WAIT$LOOP.1', '0;JMP']
+
+    def test_expand_nested_macros(self, preprocessor):
+        content = preprocessor.expand([
+            '#macro SET addr, value',
+            '@%value',
+            'D=A',
+            '@%addr',
+            'M=D',
+            '#endmacro',
+            '#macro RESET addr',
+            '#SET %addr, 0',
+            '#endmacro',
+            '#RESET R1',
+        ])
+        assert content == ['@0', 'D=A', '@R1', 'M=D']
+
+    @patch('preprocessor.Preprocessor._preprocess_lines', side_effect=lambda content: content)
+    def test_expand_caches_included_files_by_content(self, preprocess_lines, preprocessor, tmp_path):
+        (tmp_path / 'a.asm').write_text('#macro NOP\nD;JGT\n#endmacro\n', encoding='utf-8')
+        (tmp_path / 'b.asm').write_text('#macro NOP\nD;JGT\n#endmacro\n', encoding='utf-8')
+        for file_name in ('a.asm', 'b.asm', 'a.asm'):
+            assert preprocessor.expand([f'#include "{file_name}"', '#NOP'], tmp_path) == ['D;JGT']
+
+        # both files have the same content, so only the first one is parsed
+        preprocess_lines.assert_called_once()
+
+    @pytest.mark.parametrize('cache_size, parsed', (
+            (1, 3),
+            (2, 2),
+    ))
+    @patch('preprocessor.Preprocessor._preprocess_lines', side_effect=lambda content: content)
+    def test_expand_cache_size(self, preprocess_lines, tmp_path, cache_size, parsed):
+        preprocessor = Preprocessor(cache_size=cache_size)
+        for i in range(2):
+            (tmp_path / f'{i}.asm').write_text(f'@{i}', encoding='utf-8')
+        for i in (0, 1, 0):
+            assert preprocessor.expand([f'#include "{i}.asm"'], tmp_path) == [f'@{i}']
+        assert preprocess_lines.call_count == parsed
+
+    def test_expand_diamond_include(self, preprocessor, tmp_path):
+        (tmp_path / 'lib.asm').write_text('(LIBFN)\n@LIBFN\n0;JMP', encoding='utf-8')
+        (tmp_path / 'a.asm').write_text('#include "lib.asm"\n@1', encoding='utf-8')
+        (tmp_path / 'b.asm').write_text('#include "lib.asm"\n@2', encoding='utf-8')
+        content = preprocessor.expand(['#include "a.asm"', '#include "b.asm"'], tmp_path)
+        assert content == ['(LIBFN)', '@LIBFN', '0;JMP', '@1', '@2']
+
+    def test_expand_include_not_found(self, preprocessor, tmp_path):
+        with pytest.raises(HackyFailedToProcessFileError, match='No such file or directory'):
+            preprocessor.expand(['#include "missing.asm"'], tmp_path)
+
+    def test_expand_recursive_include(self, preprocessor, tmp_path):
+        (tmp_path / 'a.asm').write_text('#include "b.asm"', encoding='utf-8')
+        (tmp_path / 'b.asm').write_text('#include "a.asm"', encoding='utf-8')
+        with pytest.raises(HackyPreprocessorError, match='Recursive include of'):
+            preprocessor.expand(['#include "a.asm"'], tmp_path)
+
+    @pytest.mark.parametrize('content, error_msg', (
+            (['#include lib.asm'], 'Include path must be quoted, got: lib.asm'),
+            (['#PUSH'], "Macro 'PUSH' is not defined"),
+            (['#macro PUSH', '@0'], "Macro 'PUSH' is not terminated with '#endmacro'"),
+            (['#endmacro'], "Unexpected '#endmacro' without macro definition"),
+            (['#macro include', '#endmacro'], "Invalid macro name 'include'"),
+            (['#macro PU-SH', '#endmacro'], "Macro name 'PU-SH' can contain only allowed characters"),
+            (['#macro 1PUSH', '#endmacro'], "Macro name '1PUSH' can contain only allowed characters"),
+            (['#macro PUSH a.b', '#endmacro'], "Invalid parameter name 'a.b' of macro 'PUSH'"),
+            (['#macro PUSH a, a', '#endmacro'], "Duplicate parameter names of macro 'PUSH'"),
+            (['#macro PUSH', '#include "a.asm"', '#endmacro'], "Directive '#include \"a.asm\"' is not allowed"),
+            (['#macro PUSH a', '#endmacro', '#PUSH'], "Macro 'PUSH' expects 1 argument(s), got: 0"),
+            (['#macro PUSH', '@%a', '#endmacro', '#PUSH'], "Macro 'PUSH' has no parameter 'a'"),
+            (['#macro PUSH', '#PUSH', '#endmacro', '#PUSH'], "Recursive expansion of macro 'PUSH'"),
+            (['#macro PUSH', '#endmacro', '#macro PUSH', '@0', '#endmacro'], "Macro 'PUSH' is already defined"),
+            (['@%%L'], "Reference '%%L' is only allowed inside a macro body"),
+            (['@%value'], "Reference '%value' is only allowed inside a macro body"),
+            (['#macro M addr', '@%addr', '#endmacro', '#M %%L'], "Reference '%%L' is only allowed inside a macro body"),
+            (
+                    ['#macro M', '(%%A)', '#endmacro', '(M$A.0)', '#M'],
+                    "Label 'M$A.0' generated for macro 'M' already exists"
+            ),
+            (
+                    ['#macro M', '(%%A)', '#endmacro', '#M', '(M$A.0)'],
+                    "Label 'M$A.0' collides with a label generated for a macro"
+            ),
+    ))
+    def test_expand_error(self, preprocessor, content, error_msg):
+        with pytest.raises(HackyPreprocessorError, match=re.escape(error_msg)):
+            preprocessor.expand(content)
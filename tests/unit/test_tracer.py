@@ -0,0 +1,94 @@
+import json
+import re
+from unittest.mock import mock_open, patch
+
+import pytest
+
+from exceptions import HackyFailedToWriteFile
+from hacky import HackyAssembler
+from tracer import BINARY_RECORD_HEADER, TraceWriter
+
+
+class TestTraceWriter:
+    SOURCE = '@2\nD=A\n@i\nM=D\n(END)\n@END\n0;JMP'
+
+    def assemble_traced(self, trace_file, **kwargs):
+        with TraceWriter(str(trace_file), **kwargs) as tracer:
+            HackyAssembler(tracer=tracer).assemble_source(self.SOURCE)
+
+    def test_trace_jsonl(self, tmp_path):
+        trace_file = tmp_path / 'trace.jsonl'
+        self.assemble_traced(trace_file)
+
+        records = [json.loads(line) for line in trace_file.read_text(encoding='utf-8').splitlines()]
+        assert records == [
+            {'source': '@2', 'address': 0, 'symbol': None, 'value': None, 'word': '0000000000000010'},
+            {'source': 'D=A', 'address': 1, 'symbol': None, 'value': None, 'word': '1110110000010000'},
+            {'source': '@i', 'address': 2, 'symbol': 'i', 'value': 16, 'word': '0000000000010000'},
+            {'source': 'M=D', 'address': 3, 'symbol': None, 'value': None, 'word': '1110001100001000'},
+            {'source': '@END', 'address': 4, 'symbol': 'END', 'value': 4, 'word': '0000000000000100'},
+            {'source': '0;JMP', 'address': 5, 'symbol': None, 'value': None, 'word': '1110101010000111'},
+        ]
+
+    def test_trace_binary(self, tmp_path):
+        trace_file = tmp_path / 'trace.bin'
+        self.assemble_traced(trace_file, trace_format='binary')
+
+        data = trace_file.read_bytes()
+        records = []
+        while data:
+            address, word, value, source_len, symbol_len = BINARY_RECORD_HEADER.unpack_from(data)
+            data = data[BINARY_RECORD_HEADER.size:]
+            source, symbol = data[:source_len].decode(), data[source_len:source_len + symbol_len].decode()
+            data = data[source_len + symbol_len:]
+            records.append((source, address, symbol, value, word))
+
+        assert records[2] == ('@i', 2, 'i', 16, 0b10000)
+        assert records[5] == ('0;JMP', 5, '', -1, 0b1110101010000111)
+        assert len(records) == 6
+
+    def test_trace_disabled(self):
+        hacky = HackyAssembler()
+        with patch.object(hacky, '_resolve_trace_symbol') as resolve_trace_symbol:
+            hacky.assemble_source(self.SOURCE)
+        resolve_trace_symbol.assert_not_called()
+
+    def test_trace_invalid_format(self, tmp_path):
+        with pytest.raises(ValueError, match=re.escape("expected: 'jsonl' or 'binary', got: 'csv'")):
+            TraceWriter(str(tmp_path / 'trace.csv'), trace_format='csv')
+
+    def test_trace_open_error(self, tmp_path):
+        with pytest.raises(HackyFailedToWriteFile, match='Unable to open trace file'):
+            TraceWriter(str(tmp_path / 'missing' / 'trace.jsonl'))
+
+    def test_trace_write_error(self, tmp_path):
+        open_mock = mock_open()
+        open_mock.return_value.write.side_effect = OSError('Error msg')
+        with patch('tracer.open', open_mock, create=True):
+            tracer = TraceWriter(str(tmp_path / 'trace.jsonl'))
+        tracer.record(('@0', 0, None, None, '0000000000000000'))
+        tracer.record(('@0', 1, None, None, '0000000000000000'))
+        with pytest.raises(HackyFailedToWriteFile, match='Unable to write trace file. Reason: Error msg'):
+            tracer.close()
+
+        open_mock.return_value.write.assert_called_once()
+        open_mock.return_value.close.assert_called_once()
+
+    def test_trace_encoding_error(self, tmp_path):
+        trace_file = tmp_path / 'trace.bin'
+        tracer = TraceWriter(str(trace_file), trace_format='binary', queue_size=1)
+        tracer.record(('@0', 0, None, None, 'not a word'))
+        # the writer keeps draining after a failure, so producers do not block on a full queue
+        for address in range(10):
+            tracer.record(('@0', address, None, None, '0000000000000000'))
+        with pytest.raises(HackyFailedToWriteFile, match='Unable to write trace file. Reason: invalid literal'):
+            tracer.close()
+        assert trace_file.read_bytes() == b''
+
+    def test_trace_binary_big_program(self, tmp_path):
+        trace_file = tmp_path / 'trace.bin'
+        with TraceWriter(str(trace_file), trace_format='binary') as tracer:
+            tracer.record(('@0', 70000, None, None, '0000000000000000'))
+
+        address, *_ = BINARY_RECORD_HEADER.unpack_from(trace_file.read_bytes())
+        assert address == 70000